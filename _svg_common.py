@@ -0,0 +1,132 @@
+"""
+Shared constants and helpers for the SVG tools.
+The XML backend, SVG tree loading and writing, publisher sizes, unit
+conversion, root dimension parsing and the transform/coordinate patterns
+live here once, so the tools cannot drift apart.
+"""
+
+import re
+
+try:
+    from lxml import etree as ET
+    HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    HAVE_LXML = False
+
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+
+
+# Transform and coordinate patterns used by the bounds calculation
+_RE_TRANSLATE = re.compile(r'translate\s*\(\s*([^,\s]+)(?:\s*,\s*([^)]+))?\s*\)')
+_RE_SCALE = re.compile(r'scale\s*\(\s*([^,\s]+)(?:\s*,\s*([^)]+))?\s*\)')
+_RE_MATRIX = re.compile(r'matrix\s*\(\s*([^,\s]+)\s*,\s*([^,\s]+)\s*,\s*([^,\s]+)\s*,\s*([^,\s]+)\s*,\s*([^,\s]+)\s*,\s*([^)]+)\s*\)')
+_RE_NUM = re.compile(r'-?\d+\.?\d*')
+
+
+# Publisher dimensions in millimeters (width, height for single column)
+PUBLISHER_SIZES = {
+    'ieee-access': {'single': (88.9, None), 'double': (183.0, None), 'full': (183.0, None)},
+    'ieee-trans': {'single': (88.9, None), 'double': (183.0, None), 'full': (183.0, None)},
+    'ieee-proc': {'single': (88.9, None), 'double': (183.0, None), 'full': (183.0, None)},
+    'nature': {'single': (89.0, None), 'double': (183.0, None), 'full': (247.0, None)},
+}
+
+
+def mm_to_px(mm):
+    """Convert millimeters to pixels (SVG units) at 90 DPI."""
+    return mm * 90.0 / 25.4
+
+
+def px_to_mm(px):
+    """Convert pixels (SVG units) to millimeters at 90 DPI."""
+    return px * 25.4 / 90.0
+
+
+# Publisher dimensions converted to pixels once at import
+PUBLISHER_SIZES_PX = {
+    publisher: {
+        layout: (mm_to_px(w) if w else None, mm_to_px(h) if h else None)
+        for layout, (w, h) in layouts.items()
+    }
+    for publisher, layouts in PUBLISHER_SIZES.items()
+}
+
+
+def parse_svg_dimensions(svg_root):
+    """Extract width and height from SVG root element."""
+    width_str = svg_root.get('width', '').replace('pt', '').replace('px', '')
+    height_str = svg_root.get('height', '').replace('pt', '').replace('px', '')
+    
+    try:
+        width = float(width_str) if width_str else None
+        height = float(height_str) if height_str else None
+    except ValueError:
+        width, height = None, None
+    
+    # Fallback to viewBox if width/height not found
+    if width is None or height is None:
+        viewbox = svg_root.get('viewBox', '')
+        if viewbox:
+            parts = viewbox.split()
+            if len(parts) == 4:
+                width = float(parts[2])
+                height = float(parts[3])
+    
+    return width, height
+
+
+
+def load_svg_tree(svg_path):
+    """Parse an SVG file, using lxml's C parser when it is available."""
+    if HAVE_LXML:
+        parser = ET.XMLParser(remove_blank_text=True, remove_comments=True,
+                              remove_pis=True, huge_tree=True)
+        return ET.parse(svg_path, parser)
+    return ET.parse(svg_path)
+
+
+def new_svg_element(tag, attrib=None):
+    """Create a detached SVG element with SVG as the default namespace."""
+    if HAVE_LXML:
+        return ET.Element('{%s}%s' % (SVG_NS, tag), attrib or {}, nsmap={None: SVG_NS})
+    ET.register_namespace('', SVG_NS)
+    return ET.Element('{%s}%s' % (SVG_NS, tag), attrib or {})
+
+
+def new_svg_root(attrib):
+    """Create an <svg> root element with SVG as the default namespace."""
+    return new_svg_element('svg', attrib)
+
+
+def write_svg_tree(tree, output_path, pretty=False):
+    """
+    Write an SVG tree with an XML declaration.
+    Indentation is only added when pretty is True, since it costs an extra
+    pass over the whole tree and SVG renderers ignore the whitespace.
+    """
+    if HAVE_LXML:
+        data = ET.tostring(tree, encoding='utf-8', xml_declaration=True, pretty_print=pretty)
+    else:
+        if pretty:
+            ET.indent(tree, space='  ')
+        data = ET.tostring(tree.getroot(), encoding='utf-8', xml_declaration=True)
+    
+    # Serialize once and hand the whole buffer to a single write call
+    with open(output_path, 'wb') as f:
+        f.write(data)
+
+
+def split_transform_args(transform_str, prefix, maxsplit):
+    """
+    Split a lone 'name(v1, v2, ...)' transform into floats without a regex.
+    Returns None when the string has another shape, so callers can fall
+    back to the general regex parsing.
+    """
+    if not (transform_str.startswith(prefix) and transform_str.endswith(')')):
+        return None
+    try:
+        return [float(v) for v in transform_str[len(prefix):-1].split(',', maxsplit)]
+    except ValueError:
+        return None
@@ -4,99 +4,181 @@ SVG Axes Alignment Tool
 Aligns matplotlib-generated SVG panels by axis positions and spine lengths.
 """
 
-import xml.etree.ElementTree as ET
+import functools
+import math
 import re
 import sys
 
+from _svg_common import SVG_NS, load_svg_tree, split_transform_args, write_svg_tree
 
+_TRANSLATE_RE = re.compile(r'translate\s*\(\s*([-\d.]+)\s*,\s*([-\d.]+)\s*\)')
+_NUMBER_RE = re.compile(r'-?\d+\.?\d*')
+
+
+@functools.lru_cache(maxsize=4096)
 def parse_transform(transform_str):
-    """Parse SVG transform string into translation values."""
-    if not transform_str:
+    """
+    Parse SVG transform string into translation values.
+    Results are cached by string, since matplotlib repeats the same
+    transform on many sibling elements.
+    """
+    if not transform_str or 'translate' not in transform_str:
         return 0, 0
     
+    # Fast path for a single translate(x, y)
+    values = split_transform_args(transform_str, 'translate(', 2)
+    if values is not None and len(values) == 2:
+        return values[0], values[1]
+    
     # Match translate(x, y) or translate(x,y)
-    match = re.search(r'translate\s*\(\s*([-\d.]+)\s*,\s*([-\d.]+)\s*\)', transform_str)
+    match = _TRANSLATE_RE.search(transform_str)
     if match:
         return float(match.group(1)), float(match.group(2))
     
     return 0, 0
 
 
+def _rect_bounds(element, tx, ty):
+    get = element.get
+    x = tx + float(get('x') or 0)
+    y = ty + float(get('y') or 0)
+    width = float(get('width') or 0)
+    height = float(get('height') or 0)
+    return x, y, x + width, y + height
+
+
+def _line_bounds(element, tx, ty):
+    get = element.get
+    x1 = tx + float(get('x1') or 0)
+    y1 = ty + float(get('y1') or 0)
+    x2 = tx + float(get('x2') or 0)
+    y2 = ty + float(get('y2') or 0)
+    return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+
+def _text_bounds(element, tx, ty):
+    get = element.get
+    x = tx + float(get('x') or 0)
+    y = ty + float(get('y') or 0)
+    return x, y, x, y
+
+
+# Bounds handlers keyed by full tag (namespaced and bare), so each element
+# costs one dict lookup instead of a chain of tag.endswith() checks
+_BOUNDS_HANDLERS = {
+    tag: handler
+    for name, handler in (('rect', _rect_bounds), ('line', _line_bounds), ('text', _text_bounds))
+    for tag in (name, '{%s}%s' % (SVG_NS, name))
+}
+
+
 def get_element_bounds(element, current_transform=(0, 0)):
-    """Recursively calculate bounding box of an SVG element."""
-    tx, ty = current_transform
-    
-    # Check for transform on this element
-    transform = element.get('transform', '')
-    if transform:
-        dx, dy = parse_transform(transform)
-        tx += dx
-        ty += dy
-    
+    """
+    Calculate bounding box of an SVG element and its descendants.
+    Walks the subtree with an explicit stack instead of recursion.
+    """
     min_x, min_y = float('inf'), float('inf')
     max_x, max_y = float('-inf'), float('-inf')
     
-    # Check element attributes for position
-    if element.tag.endswith('rect'):
-        x = float(element.get('x', 0))
-        y = float(element.get('y', 0))
-        width = float(element.get('width', 0))
-        height = float(element.get('height', 0))
-        min_x = min(min_x, tx + x)
-        min_y = min(min_y, ty + y)
-        max_x = max(max_x, tx + x + width)
-        max_y = max(max_y, ty + y + height)
-    elif element.tag.endswith('line'):
-        x1 = float(element.get('x1', 0))
-        y1 = float(element.get('y1', 0))
-        x2 = float(element.get('x2', 0))
-        y2 = float(element.get('y2', 0))
-        min_x = min(min_x, tx + x1, tx + x2)
-        min_y = min(min_y, ty + y1, ty + y2)
-        max_x = max(max_x, tx + x1, tx + x2)
-        max_y = max(max_y, ty + y1, ty + y2)
-    elif element.tag.endswith('text'):
-        x = float(element.get('x', 0))
-        y = float(element.get('y', 0))
-        min_x = min(min_x, tx + x)
-        min_y = min(min_y, ty + y)
-        max_x = max(max_x, tx + x)
-        max_y = max(max_y, ty + y)
-    
-    # Recursively process children
-    for child in element:
-        child_min_x, child_min_y, child_max_x, child_max_y = get_element_bounds(child, (tx, ty))
-        if child_min_x != float('inf'):
-            min_x = min(min_x, child_min_x)
-            min_y = min(min_y, child_min_y)
-            max_x = max(max_x, child_max_x)
-            max_y = max(max_y, child_max_y)
+    stack = [(element, current_transform[0], current_transform[1])]
+    while stack:
+        el, tx, ty = stack.pop()
+        
+        # Check for transform on this element
+        transform = el.get('transform', '')
+        if transform:
+            dx, dy = parse_transform(transform)
+            tx += dx
+            ty += dy
+        
+        # Check element attributes for position
+        handler = _BOUNDS_HANDLERS.get(el.tag)
+        if handler is not None:
+            x0, y0, x1, y1 = handler(el, tx, ty)
+            if x0 < min_x:
+                min_x = x0
+            if y0 < min_y:
+                min_y = y0
+            if x1 > max_x:
+                max_x = x1
+            if y1 > max_y:
+                max_y = y1
+        
+        # Queue children with the accumulated translation
+        stack.extend((child, tx, ty) for child in el)
     
     return min_x, min_y, max_x, max_y
 
 
+def _rect_max_y(element, ty):
+    get = element.get
+    return ty + float(get('y') or 0) + float(get('height') or 0)
+
+
+def _path_max_y(element, ty):
+    # Path data as x,y pairs; adequate for matplotlib's absolute M/L patch outlines
+    ys = _NUMBER_RE.findall(element.get('d') or '')[1::2]
+    if not ys:
+        return float('-inf')
+    return ty + max(float(y) for y in ys)
+
+
+_PATCH_MAX_Y_HANDLERS = {
+    tag: handler
+    for name, handler in (('path', _path_max_y), ('rect', _rect_max_y))
+    for tag in (name, '{%s}%s' % (SVG_NS, name))
+}
+
+
+def get_patch_max_y(group):
+    """
+    Bottom edge of the background patch inside a matplotlib axes group.
+    Matplotlib draws the axes background as <g id="patch_N"> holding a
+    single path or rect spanning the plot area, so only that shape is
+    measured instead of the whole subtree. Returns None if the group has
+    no such patch.
+    """
+    stack = [(group, 0.0)]
+    while stack:
+        el, ty = stack.pop()
+        
+        transform = el.get('transform', '')
+        if transform:
+            ty += parse_transform(transform)[1]
+        
+        if (el.get('id') or '').startswith('patch_'):
+            max_y = float('-inf')
+            for child in el:
+                handler = _PATCH_MAX_Y_HANDLERS.get(child.tag)
+                if handler is not None:
+                    child_ty = ty + parse_transform(child.get('transform', ''))[1]
+                    y = handler(child, child_ty)
+                    if y > max_y:
+                        max_y = y
+            return max_y if max_y != float('-inf') else None
+        
+        # Children in reverse so the first patch in document order is found
+        stack.extend((child, ty) for child in reversed(el))
+    
+    return None
+
+
 def find_axes_groups(root):
     """Find all matplotlib axes groups in SVG."""
+    # Matplotlib marks axes groups with ids like "axes_1" / "matplotlib.axis_1";
+    # root.iter() walks the tree in document order without Python recursion
     axes_groups = []
-    
-    def search_element(element):
-        # Check if this is an axes group (matplotlib uses specific IDs)
-        element_id = element.get('id', '')
-        if 'axes' in element_id.lower() or 'axis' in element_id.lower():
+    for element in root.iter():
+        element_id = (element.get('id') or '').lower()
+        if 'axes' in element_id or 'axis' in element_id:
             axes_groups.append(element)
-        
-        # Recursively search children
-        for child in element:
-            search_element(child)
-    
-    search_element(root)
     return axes_groups
 
 
 def align_svg_panels(svg_path, args):
     """Align panels in an SVG file according to specified parameters."""
     try:
-        tree = ET.parse(svg_path)
+        tree = load_svg_tree(svg_path)
         root = tree.getroot()
         
         # Find all axes groups
@@ -106,26 +188,32 @@ def align_svg_panels(svg_path, args):
             print("Not enough axes groups found for alignment", file=sys.stderr)
             return False
         
-        # Get bounds for each axes group
-        axes_bounds = []
-        for axes_group in axes_groups:
-            bounds = get_element_bounds(axes_group)
-            axes_bounds.append(bounds)
-        
         # Alignment based on mode
         if args.align_mode == 'patch-bottom':
-            # Align by bottom edge of plot area
-            min_bottom = min(bounds[3] for bounds in axes_bounds)
+            # Align by bottom edge of plot area, read from each axes background
+            # patch. Groups without a patch (e.g. matplotlib.axis_N, nested in
+            # their axes group) have no plot area and are left where they are.
+            patched = []
+            for axes_group in axes_groups:
+                bottom = get_patch_max_y(axes_group)
+                if bottom is not None and math.isfinite(bottom):
+                    patched.append((axes_group, bottom))
             
-            for axes_group, bounds in zip(axes_groups, axes_bounds):
-                current_bottom = bounds[3]
-                offset = current_bottom - min_bottom
+            if len(patched) < 2:
+                print("Not enough axes background patches found for alignment", file=sys.stderr)
+            else:
+                min_bottom = min(bottom for _, bottom in patched)
+                
+                # Plan all shifts first, then rewrite the transforms in one pass
+                pending = {}
+                for axes_group, current_bottom in patched:
+                    offset = current_bottom - min_bottom
+                    if abs(offset) > 0.1:  # Only adjust if significant difference
+                        tx, ty = parse_transform(axes_group.get('transform', ''))
+                        pending[axes_group] = (tx, ty - offset)
                 
-                if abs(offset) > 0.1:  # Only adjust if significant difference
-                    current_transform = axes_group.get('transform', '')
-                    tx, ty = parse_transform(current_transform)
-                    new_transform = f'translate({tx}, {ty - offset})'
-                    axes_group.set('transform', new_transform)
+                for axes_group, (tx, ty) in pending.items():
+                    axes_group.set('transform', f'translate({tx}, {ty})')
         
         elif args.align_mode == 'xlabel':
             # Align by x-axis label baseline
@@ -137,8 +225,7 @@ def align_svg_panels(svg_path, args):
             print("Spine equalization requested but not yet implemented", file=sys.stderr)
         
         # Write back to file
-        ET.indent(tree, space='  ')
-        tree.write(svg_path, encoding='utf-8', xml_declaration=True)
+        write_svg_tree(tree, svg_path, pretty=getattr(args, 'pretty', False))
         print(f"Alignment applied to: {svg_path}")
         return True
         
@@ -159,6 +246,8 @@ def main():
                         help='Equalize x-axis spine lengths')
     parser.add_argument('--align-yspine-equalize', action='store_true',
                         help='Equalize y-axis spine lengths')
+    parser.add_argument('--pretty', action='store_true',
+                        help='Indent the output SVG for readability')
     
     args = parser.parse_args()
     
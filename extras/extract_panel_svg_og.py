@@ -5,168 +5,268 @@ Extracts individual panels from composite matplotlib SVG figures.
 """
 
 import argparse
-import xml.etree.ElementTree as ET
+import functools
 import re
 import sys
 from pathlib import Path
 
+# The shared helpers live in the repository root, one level up
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from _svg_common import (  # noqa: E402
+    ET, HAVE_LXML, SVG_NS, load_svg_tree, new_svg_root, split_transform_args, write_svg_tree,
+)
+
+IDENTITY_MATRIX = (1, 0, 0, 1, 0, 0)
+
+_MATRIX_RE = re.compile(r'matrix\s*\(\s*' + r'\s*,\s*'.join([r'([-\d.]+)'] * 6) + r'\s*\)')
+_TRANSLATE_RE = re.compile(r'translate\s*\(\s*([-\d.]+)\s*,\s*([-\d.]+)\s*\)')
+_SCALE_RE = re.compile(r'scale\s*\(\s*([-\d.]+)(?:\s*,\s*([-\d.]+))?\s*\)')
+
+
+@functools.lru_cache(maxsize=8192)
 def parse_transform_matrix(transform_str):
-    """Parse SVG transform matrix into components."""
+    """
+    Parse SVG transform matrix into an (a, b, c, d, e, f) tuple.
+    Results are cached by string, since matplotlib repeats the same
+    transform on many sibling elements.
+    """
     if not transform_str:
-        return {'a': 1, 'b': 0, 'c': 0, 'd': 1, 'e': 0, 'f': 0}
+        return IDENTITY_MATRIX
+    
+    # Fast paths for a single translate/matrix/scale, most frequent first
+    values = split_transform_args(transform_str, 'translate(', 2)
+    if values is not None and len(values) == 2:
+        return (1, 0, 0, 1, values[0], values[1])
+    values = split_transform_args(transform_str, 'matrix(', 6)
+    if values is not None and len(values) == 6:
+        return tuple(values)
+    values = split_transform_args(transform_str, 'scale(', 2)
+    if values is not None and len(values) in (1, 2):
+        return (values[0], 0, 0, values[-1], 0, 0)
     
     # Match matrix(a, b, c, d, e, f)
-    matrix_match = re.search(r'matrix\s*\(\s*([-\d.]+)\s*,\s*([-\d.]+)\s*,\s*([-\d.]+)\s*,\s*([-\d.]+)\s*,\s*([-\d.]+)\s*,\s*([-\d.]+)\s*\)', transform_str)
+    matrix_match = _MATRIX_RE.search(transform_str) if 'matrix' in transform_str else None
     if matrix_match:
-        return {
-            'a': float(matrix_match.group(1)),
-            'b': float(matrix_match.group(2)),
-            'c': float(matrix_match.group(3)),
-            'd': float(matrix_match.group(4)),
-            'e': float(matrix_match.group(5)),
-            'f': float(matrix_match.group(6))
-        }
+        return tuple(float(v) for v in matrix_match.groups())
     
     # Match translate(x, y)
-    translate_match = re.search(r'translate\s*\(\s*([-\d.]+)\s*,\s*([-\d.]+)\s*\)', transform_str)
+    translate_match = _TRANSLATE_RE.search(transform_str) if 'translate' in transform_str else None
     if translate_match:
-        return {
-            'a': 1, 'b': 0, 'c': 0, 'd': 1,
-            'e': float(translate_match.group(1)),
-            'f': float(translate_match.group(2))
-        }
+        return (1, 0, 0, 1, float(translate_match.group(1)), float(translate_match.group(2)))
     
     # Match scale(sx, sy)
-    scale_match = re.search(r'scale\s*\(\s*([-\d.]+)(?:\s*,\s*([-\d.]+))?\s*\)', transform_str)
+    scale_match = _SCALE_RE.search(transform_str) if 'scale' in transform_str else None
     if scale_match:
         sx = float(scale_match.group(1))
         sy = float(scale_match.group(2)) if scale_match.group(2) else sx
-        return {'a': sx, 'b': 0, 'c': 0, 'd': sy, 'e': 0, 'f': 0}
+        return (sx, 0, 0, sy, 0, 0)
     
-    return {'a': 1, 'b': 0, 'c': 0, 'd': 1, 'e': 0, 'f': 0}
+    return IDENTITY_MATRIX
 
 
-def get_element_bounds(element, parent_transform=None):
-    """Calculate bounding box of an element considering transforms."""
-    if parent_transform is None:
-        parent_transform = {'a': 1, 'b': 0, 'c': 0, 'd': 1, 'e': 0, 'f': 0}
-    
-    # Parse this element's transform
-    transform_str = element.get('transform', '')
-    local_transform = parse_transform_matrix(transform_str)
-    
-    # Combine with parent transform (simplified - assumes no skew)
-    combined_transform = {
-        'a': parent_transform['a'] * local_transform['a'],
-        'b': parent_transform['b'] + local_transform['b'],
-        'c': parent_transform['c'] + local_transform['c'],
-        'd': parent_transform['d'] * local_transform['d'],
-        'e': parent_transform['e'] + local_transform['e'],
-        'f': parent_transform['f'] + local_transform['f']
-    }
-    
+def _rect_bounds(element, a, d, e, f):
+    get = element.get
+    x_t = a * float(get('x') or 0) + e
+    y_t = d * float(get('y') or 0) + f
+    return (x_t, y_t,
+            x_t + a * float(get('width') or 0),
+            y_t + d * float(get('height') or 0))
+
+
+def _line_bounds(element, a, d, e, f):
+    get = element.get
+    x1_t = a * float(get('x1') or 0) + e
+    y1_t = d * float(get('y1') or 0) + f
+    x2_t = a * float(get('x2') or 0) + e
+    y2_t = d * float(get('y2') or 0) + f
+    return min(x1_t, x2_t), min(y1_t, y2_t), max(x1_t, x2_t), max(y1_t, y2_t)
+
+
+def _text_bounds(element, a, d, e, f):
+    get = element.get
+    x_t = a * float(get('x') or 0) + e
+    y_t = d * float(get('y') or 0) + f
+    # Approximate text height (10) and width (50)
+    return x_t, y_t - 10, x_t + 50, y_t
+
+
+# Bounds handlers keyed by full tag (namespaced and bare), so each element
+# costs one dict lookup instead of stripping the namespace from its tag
+_BOUNDS_HANDLERS = {
+    tag: handler
+    for name, handler in (('rect', _rect_bounds), ('line', _line_bounds), ('text', _text_bounds))
+    for tag in (name, '{%s}%s' % (SVG_NS, name))
+}
+
+
+def get_element_bounds(element, parent_transform=IDENTITY_MATRIX):
+    """
+    Calculate bounding box of an element considering transforms.
+    parent_transform is an (a, b, c, d, e, f) tuple. The subtree is walked
+    with an explicit stack whose entries carry the accumulated scale and
+    translation as plain floats; skew terms are ignored.
+    """
     min_x, min_y = float('inf'), float('inf')
     max_x, max_y = float('-inf'), float('-inf')
     
-    # Check element type and extract bounds
-    tag = element.tag.split('}')[-1] if '}' in element.tag else element.tag
-    
-    if tag == 'rect':
-        x = float(element.get('x', 0))
-        y = float(element.get('y', 0))
-        width = float(element.get('width', 0))
-        height = float(element.get('height', 0))
+    pa, _, _, pd, pe, pf = parent_transform
+    stack = [(element, pa, pd, pe, pf)]
+    while stack:
+        el, a, d, e, f = stack.pop()
         
-        # Apply transform
-        x_transformed = combined_transform['a'] * x + combined_transform['e']
-        y_transformed = combined_transform['d'] * y + combined_transform['f']
-        width_transformed = combined_transform['a'] * width
-        height_transformed = combined_transform['d'] * height
+        # Combine this element's transform with the parent (simplified - assumes no skew)
+        transform_str = el.get('transform', '')
+        if transform_str:
+            la, _, _, ld, le, lf = parse_transform_matrix(transform_str)
+            a *= la
+            d *= ld
+            e += le
+            f += lf
         
-        min_x = x_transformed
-        min_y = y_transformed
-        max_x = x_transformed + width_transformed
-        max_y = y_transformed + height_transformed
+        # Extract bounds for shape elements
+        handler = _BOUNDS_HANDLERS.get(el.tag)
+        if handler is not None:
+            x0, y0, x1, y1 = handler(el, a, d, e, f)
+            if x0 < min_x:
+                min_x = x0
+            if y0 < min_y:
+                min_y = y0
+            if x1 > max_x:
+                max_x = x1
+            if y1 > max_y:
+                max_y = y1
+        
+        # Queue children with the combined transform
+        stack.extend((child, a, d, e, f) for child in el)
     
-    elif tag == 'line':
-        x1 = float(element.get('x1', 0))
-        y1 = float(element.get('y1', 0))
-        x2 = float(element.get('x2', 0))
-        y2 = float(element.get('y2', 0))
+    return min_x, min_y, max_x, max_y
+
+
+def iter_svg_events(svg_path, events):
+    """
+    Stream parse events for an SVG file with the same options as load_svg_tree.
+    The file is opened here, so it is closed as soon as the caller stops
+    iterating, even part way through.
+    """
+    with open(svg_path, 'rb') as f:
+        if HAVE_LXML:
+            yield from ET.iterparse(f, events=events, remove_blank_text=True,
+                                    remove_comments=True, remove_pis=True, huge_tree=True)
+        else:
+            yield from ET.iterparse(f, events=events)
+
+
+def _release(element, parent):
+    """Free a finished element's content and any earlier finished siblings."""
+    element.clear()
+    del parent[:-1]
+
+
+def _scan_panel_labels(svg_path, panel_label):
+    """
+    Stream the file once, recording panel labels and where the requested
+    panel sits. Returns (labels, path): path is the tuple of child indices
+    leading from the root to the panel, or None if it was not found.
+    Every element is released as soon as it ends, at any depth.
+    """
+    # One entry per open element: [element, own label, labels below it, target path below it, children seen]
+    stack = []
+    for event, element in iter_svg_events(svg_path, ('start', 'end')):
+        if event == 'start':
+            if stack:
+                stack[-1][4] += 1
+            stack.append([element, None, None, None, 0])
+            continue
         
-        x1_t = combined_transform['a'] * x1 + combined_transform['e']
-        y1_t = combined_transform['d'] * y1 + combined_transform['f']
-        x2_t = combined_transform['a'] * x2 + combined_transform['e']
-        y2_t = combined_transform['d'] * y2 + combined_transform['f']
+        _, own_label, nested, found, _ = stack.pop()
+        if own_label is not None:
+            # A panel hides any panels nested inside it
+            nested = {own_label}
+            found = tuple(entry[4] - 1 for entry in stack) if own_label == panel_label else None
         
-        min_x = min(x1_t, x2_t)
-        min_y = min(y1_t, y2_t)
-        max_x = max(x1_t, x2_t)
-        max_y = max(y1_t, y2_t)
-    
-    elif tag == 'text':
-        x = float(element.get('x', 0))
-        y = float(element.get('y', 0))
+        if not stack:
+            return nested or set(), found
         
-        x_t = combined_transform['a'] * x + combined_transform['e']
-        y_t = combined_transform['d'] * y + combined_transform['f']
+        parent = stack[-1]
+        # The first single-letter text child makes the parent a panel
+        if parent[1] is None and element.tag.endswith('text') and parent[0].tag.endswith('g'):
+            text = (element.text or '').strip()
+            if len(text) == 1 and text.isalpha():
+                parent[1] = text.lower()
+        if nested:
+            if parent[2] is None:
+                parent[2] = set()
+            parent[2] |= nested
+        if found is not None:
+            parent[3] = found
         
-        min_x = x_t
-        min_y = y_t - 10  # Approximate text height
-        max_x = x_t + 50  # Approximate text width
-        max_y = y_t
+        # Labels and the panel's position are recorded; the content is not needed
+        _release(element, parent[0])
     
-    # Process children recursively
-    for child in element:
-        child_bounds = get_element_bounds(child, combined_transform)
-        if child_bounds[0] != float('inf'):
-            min_x = min(min_x, child_bounds[0])
-            min_y = min(min_y, child_bounds[1])
-            max_x = max(max_x, child_bounds[2])
-            max_y = max(max_y, child_bounds[3])
-    
-    return min_x, min_y, max_x, max_y
+    return set(), None
 
 
-def find_panels(svg_root):
-    """Find all labeled panels in an SVG (e.g., groups with panel labels)."""
-    panels = {}
-    
-    def search_for_panels(element, depth=0):
-        # Look for groups that might be panels
-        element_id = element.get('id', '')
-        
-        # Check if this looks like a panel group
-        if element.tag.endswith('g'):
-            # Look for text labels in this group
-            for child in element:
-                if child.tag.endswith('text'):
-                    text = (child.text or '').strip()
-                    # Check if it's a single letter label
-                    if len(text) == 1 and text.isalpha():
-                        panels[text.lower()] = element
-                        return
+def _read_subtree(svg_path, path):
+    """
+    Stream the file again and return the element at path (child indices
+    from the root), keeping only that subtree and its ancestors' shells.
+    """
+    depth = len(path)
+    # One entry per open element: [element, on path to target, inside target, children seen]
+    stack = []
+    for event, element in iter_svg_events(svg_path, ('start', 'end')):
+        if event == 'start':
+            if not stack:
+                stack.append([element, True, False, 0])
+                continue
+            parent = stack[-1]
+            parent[3] += 1
+            level = len(stack)
+            inside = parent[2] or (parent[1] and level - 1 == depth)
+            on_path = (not inside and parent[1] and level <= depth
+                       and path[level - 1] == parent[3] - 1)
+            stack.append([element, on_path, inside, 0])
+            continue
         
-        # Recursively search children
-        for child in element:
-            search_for_panels(child, depth + 1)
+        _, on_path, inside, _ = stack.pop()
+        if on_path and len(stack) == depth:
+            return element
+        if not (on_path or inside):
+            _release(element, stack[-1][0])
+    
+    return None
+
+
+def scan_panels(svg_path, panel_label=None):
+    """
+    Find panel labels, and optionally one panel's group, by streaming the file.
+    A group is a panel when one of its direct text children is a single
+    letter; labels nested inside a panel are ignored, and the last panel
+    with a given label wins.
     
-    search_for_panels(svg_root)
-    return panels
+    Returns (labels, panel_group); panel_group is None unless panel_label is
+    given and found. Finished elements are released at every depth while
+    scanning, and the requested panel is then read in a second streaming
+    pass that keeps only its subtree, so the whole file is never resident.
+    """
+    labels, path = _scan_panel_labels(svg_path, panel_label)
+    if panel_label is None or path is None:
+        return labels, None
+    if not path:
+        # The root itself is the panel
+        return labels, load_svg_tree(svg_path).getroot()
+    return labels, _read_subtree(svg_path, path)
 
 
 def list_panels(svg_path):
     """List all available panels in an SVG file."""
     try:
-        tree = ET.parse(svg_path)
-        root = tree.getroot()
-        
-        panels = find_panels(root)
+        panels, _ = scan_panels(svg_path)
         
         if panels:
             print(f"Found {len(panels)} panels:")
-            for label in sorted(panels.keys()):
+            for label in sorted(panels):
                 print(f"  - {label}")
         else:
             print("No labeled panels found in the SVG")
@@ -179,21 +279,17 @@ def list_panels(svg_path):
         return False
 
 
-def extract_panel(svg_path, panel_label, output_path):
+def extract_panel(svg_path, panel_label, output_path, pretty=False):
     """Extract a specific panel from a composite SVG."""
     try:
-        tree = ET.parse(svg_path)
-        root = tree.getroot()
-        
-        panels = find_panels(root)
+        # Locate the panel while parsing, without keeping the rest of the tree
+        panels, panel_group = scan_panels(svg_path, panel_label)
         
-        if panel_label not in panels:
+        if panel_group is None:
             print(f"Panel '{panel_label}' not found", file=sys.stderr)
-            print(f"Available panels: {', '.join(sorted(panels.keys()))}", file=sys.stderr)
+            print(f"Available panels: {', '.join(sorted(panels))}", file=sys.stderr)
             return False
         
-        panel_group = panels[panel_label]
-        
         # Calculate bounds of the panel
         bounds = get_element_bounds(panel_group)
         
@@ -206,28 +302,22 @@ def extract_panel(svg_path, panel_label, output_path):
         height = max_y - min_y
         
         # Create new SVG with just this panel
-        svg_ns = "http://www.w3.org/2000/svg"
-        ET.register_namespace('', svg_ns)
-        
-        new_root = ET.Element('{%s}svg' % svg_ns, {
+        new_root = new_svg_root({
             'width': str(width),
             'height': str(height),
             'viewBox': f'0 0 {width} {height}'
         })
         
         # Create a group with translation to origin
-        content_group = ET.SubElement(new_root, 'g', {
+        content_group = ET.SubElement(new_root, '{%s}g' % SVG_NS, {
             'transform': f'translate({-min_x}, {-min_y})'
         })
         
-        # Copy panel content
-        for child in panel_group:
-            content_group.append(child)
+        # Move panel content in one call (lxml reparents on extend, so snapshot first)
+        content_group.extend(list(panel_group))
         
         # Write output
-        new_tree = ET.ElementTree(new_root)
-        ET.indent(new_tree, space='  ')
-        new_tree.write(output_path, encoding='utf-8', xml_declaration=True)
+        write_svg_tree(ET.ElementTree(new_root), output_path, pretty=pretty)
         
         print(f"Extracted panel '{panel_label}' to: {output_path}")
         return True
@@ -245,13 +335,14 @@ def main():
     parser.add_argument('--list', action='store_true', help='List available panels')
     parser.add_argument('--panel', help='Panel label to extract (e.g., a, b, c)')
     parser.add_argument('--output', '-o', help='Output SVG file')
+    parser.add_argument('--pretty', action='store_true', help='Indent the output SVG for readability')
     
     args = parser.parse_args()
     
     if args.list:
         success = list_panels(args.input)
     elif args.panel and args.output:
-        success = extract_panel(args.input, args.panel.lower(), args.output)
+        success = extract_panel(args.input, args.panel.lower(), args.output, args.pretty)
     else:
         parser.print_help()
         return 1
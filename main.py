@@ -5,54 +5,104 @@ Combines multiple SVG panels into publisher-ready figures with automatic scaling
 """
 
 import argparse
-import xml.etree.ElementTree as ET
+import codecs
+import functools
+import io
+import os
 import re
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from xml.parsers import expat
+from xml.sax.saxutils import escape, quoteattr
 
+# NumPy is an optional speedup, like lxml: it is only used where inputs are
+# large (long path coordinate lists); small inputs such as the layout's
+# per-panel sizes stay on plain Python, where array setup would cost more
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:
+    HAVE_NUMPY = False
 
-# Publisher dimensions in millimeters (width, height for single column)
-PUBLISHER_SIZES = {
-    'ieee-access': {'single': (88.9, None), 'double': (183.0, None), 'full': (183.0, None)},
-    'ieee-trans': {'single': (88.9, None), 'double': (183.0, None), 'full': (183.0, None)},
-    'ieee-proc': {'single': (88.9, None), 'double': (183.0, None), 'full': (183.0, None)},
-    'nature': {'single': (89.0, None), 'double': (183.0, None), 'full': (247.0, None)},
+from _svg_common import (
+    ET, HAVE_LXML, SVG_NS, PUBLISHER_SIZES_PX, parse_svg_dimensions,
+    load_svg_tree, write_svg_tree,
+    _RE_TRANSLATE, _RE_SCALE, _RE_MATRIX, _RE_NUM,
+)
+
+
+# Raw-markup patterns for splicing panel files without parsing them
+_SVG_START_TAG_RE = re.compile(rb"""<svg(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*\s*>""")
+_XML_ENCODING_RE = re.compile(rb"""\s*<\?xml[^>]*?encoding\s*=\s*["']([\w.-]+)""")
+
+# Path data tokens for --optimize-paths: command, number, separator, or
+# anything else (arcs and malformed data are left untouched)
+_PATH_TOKEN_RE = re.compile(
+    r'([MmZzLlHhVvCcSsQqTt])|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)|([\s,]+)|(.)')
+_PATH_ARG_COUNTS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'Z': 0}
+_PATH_TAGS = frozenset(('{%s}path' % SVG_NS, 'path'))
+
+# Panel label attributes; font-size is replaced by --panel-label-font-size
+_LABEL_ATTRS = {
+    'x': '5',
+    'y': '15',
+    'font-size': '12',
+    'font-weight': 'bold',
+    'font-family': 'Arial, sans-serif'
 }
 
+# Coordinate lists at least this long are reduced with NumPy when available
+_NUMPY_MIN_COORDS = 64
 
-def mm_to_px(mm):
-    """Convert millimeters to pixels (SVG units) at 90 DPI."""
-    return mm * 90.0 / 25.4
+# Panels seen by load_panel_tree, by absolute path: (mtime, size, serialized
+# root or None, dimensions). Bytes rather than a tree are kept, so no parsed
+# tree outlives the call (and thread) that built it. They are only kept once
+# a file is loaded a second time, so a single composite of distinct panels retains
+# nothing; batch drivers reusing panels skip the reparse. At most
+# _PANEL_CACHE_SIZE entries are kept, least recently used dropped first.
+# Panels load in worker threads, so every access holds _PANEL_CACHE_LOCK.
+_PANEL_CACHE = {}
+_PANEL_CACHE_SIZE = 8
+_PANEL_CACHE_LOCK = threading.Lock()
 
 
-def px_to_mm(px):
-    """Convert pixels (SVG units) to millimeters at 90 DPI."""
-    return px * 25.4 / 90.0
+def read_svg_dimensions(svg_path):
+    """Return (width, height) of an SVG file, reading only up to its root tag."""
+    with open(svg_path, 'rb') as f:
+        for _, svg_root in ET.iterparse(f, events=('start',)):
+            return parse_svg_dimensions(svg_root)
+    return None, None
 
 
-def parse_svg_dimensions(svg_root):
-    """Extract width and height from SVG root element."""
-    width_str = svg_root.get('width', '').replace('pt', '').replace('px', '')
-    height_str = svg_root.get('height', '').replace('pt', '').replace('px', '')
-    
-    try:
-        width = float(width_str) if width_str else None
-        height = float(height_str) if height_str else None
-    except ValueError:
-        width, height = None, None
-    
-    # Fallback to viewBox if width/height not found
-    if width is None or height is None:
-        viewbox = svg_root.get('viewBox', '')
-        if viewbox:
-            parts = viewbox.split()
-            if len(parts) == 4:
-                width = float(parts[2])
-                height = float(parts[3])
-    
-    return width, height
+def write_svg_stream(root_attrib, elements, output_path, pretty=False):
+    """
+    Write an <svg> document one top-level element at a time.
+    The root start tag is written directly and each element from the
+    elements iterable is serialized and written as soon as it is produced,
+    so the finished document is never held as a single tree or buffer.
+    """
+    attrs = ''.join(f' {name}={quoteattr(str(value))}' for name, value in root_attrib.items())
+    # Each element is serialized standalone, so it redeclares the default
+    # namespace the root already declares; that copy is dropped
+    redundant_xmlns = f' xmlns="{SVG_NS}"'.encode('utf-8')
+    if not HAVE_LXML:
+        ET.register_namespace('', SVG_NS)
+    with open(output_path, 'wb') as f:
+        f.write(f"<?xml version='1.0' encoding='utf-8'?>\n<svg xmlns=\"{SVG_NS}\"{attrs}>".encode('utf-8'))
+        for element in elements:
+            if pretty:
+                ET.indent(element, space='  ', level=1)
+                f.write(b'\n  ')
+            data = ET.tostring(element, encoding='utf-8')
+            if redundant_xmlns in data[:data.find(b'>')]:
+                data = data.replace(redundant_xmlns, b'', 1)
+            f.write(data)
+        f.write(b'\n</svg>' if pretty else b'</svg>')
 
 
+@functools.lru_cache(maxsize=4096)
 def parse_transform(transform_str):
     """
     Parse SVG transform attribute and return (tx, ty, sx, sy) tuple.
@@ -63,20 +113,23 @@ def parse_transform(transform_str):
     
     tx, ty, sx, sy = 0, 0, 1, 1
     
+    # Each pattern needs its function name, so a substring check skips
+    # the regex for functions the attribute does not use
+    
     # Parse translate
-    translate_match = re.search(r'translate\s*\(\s*([^,\s]+)(?:\s*,\s*([^)]+))?\s*\)', transform_str)
+    translate_match = 'translate' in transform_str and _RE_TRANSLATE.search(transform_str)
     if translate_match:
         tx = float(translate_match.group(1))
         ty = float(translate_match.group(2)) if translate_match.group(2) else 0
     
     # Parse scale
-    scale_match = re.search(r'scale\s*\(\s*([^,\s]+)(?:\s*,\s*([^)]+))?\s*\)', transform_str)
+    scale_match = 'scale' in transform_str and _RE_SCALE.search(transform_str)
     if scale_match:
         sx = float(scale_match.group(1))
         sy = float(scale_match.group(2)) if scale_match.group(2) else sx
     
     # Parse matrix (simplified - only handles translation and scale in matrix form)
-    matrix_match = re.search(r'matrix\s*\(\s*([^,\s]+)\s*,\s*([^,\s]+)\s*,\s*([^,\s]+)\s*,\s*([^,\s]+)\s*,\s*([^,\s]+)\s*,\s*([^)]+)\s*\)', transform_str)
+    matrix_match = 'matrix' in transform_str and _RE_MATRIX.search(transform_str)
     if matrix_match:
         a, b, c, d, e, f = [float(x) for x in matrix_match.groups()]
         # For matrices without rotation/skew: a=sx, d=sy, e=tx, f=ty
@@ -88,6 +141,19 @@ def parse_transform(transform_str):
     return (tx, ty, sx, sy)
 
 
+def _path_coords(path_data):
+    """
+    Return the numeric coordinates in path/points data.
+    Long coordinate lists come back as a NumPy array when NumPy is
+    installed, otherwise as a tuple of floats. Not cached: path data
+    rarely repeats, and the keys and arrays would be kept for good.
+    """
+    coords = _RE_NUM.findall(path_data)
+    if HAVE_NUMPY and len(coords) >= _NUMPY_MIN_COORDS:
+        return np.array(coords, dtype=np.float64)
+    return tuple(float(c) for c in coords)
+
+
 def get_path_bounds(path_data):
     """
     Parse SVG path 'd' attribute and return bounding box.
@@ -98,20 +164,40 @@ def get_path_bounds(path_data):
     
     # Extract all numeric coordinates from path data
     # Match numbers (including negative and decimal)
-    coords = re.findall(r'-?\d+\.?\d*', path_data)
-    if not coords:
-        return None
-    
-    coords = [float(c) for c in coords]
-    
-    # Split into x,y pairs
-    x_coords = coords[0::2]
-    y_coords = coords[1::2]
-    
-    if not x_coords or not y_coords:
+    coords = _path_coords(path_data)
+    count = len(coords)
+    if count < 2:
         return None
     
-    return (min(x_coords), min(y_coords), max(x_coords), max(y_coords))
+    if HAVE_NUMPY and not isinstance(coords, tuple):
+        # One reduce per axis over the (x, y) pairs; a trailing unpaired x is
+        # folded in separately
+        pairs = coords[:count - count % 2].reshape(-1, 2)
+        min_x, min_y = pairs.min(axis=0).tolist()
+        max_x, max_y = pairs.max(axis=0).tolist()
+    else:
+        # Walk the x,y pairs once, updating all four extremes in the same pass
+        it = iter(coords)
+        min_x = max_x = next(it)
+        min_y = max_y = next(it)
+        for x, y in zip(it, it):
+            if x < min_x:
+                min_x = x
+            elif x > max_x:
+                max_x = x
+            if y < min_y:
+                min_y = y
+            elif y > max_y:
+                max_y = y
+    
+    if count % 2:
+        x = coords[-1]
+        if x < min_x:
+            min_x = float(x)
+        elif x > max_x:
+            max_x = float(x)
+    
+    return (min_x, min_y, max_x, max_y)
 
 
 def is_white_background(element):
@@ -164,10 +250,161 @@ def is_white_background(element):
     return False
 
 
+def compact_path_data(path_data):
+    """
+    Rewrite straight path segments that are horizontal or vertical as H/V
+    (or h/v) segments, which draw the same line with one number fewer.
+    Path data containing arcs or anything that does not tokenize cleanly is
+    returned unchanged.
+    """
+    # Tokenize into (command, [number strings]) segments in one pass
+    segments = []
+    for cmd, num, _, other in _PATH_TOKEN_RE.findall(path_data):
+        if other:
+            return path_data
+        if cmd:
+            segments.append((cmd, []))
+        elif num:
+            if not segments:
+                return path_data
+            segments[-1][1].append(num)
+    
+    out = []
+    last_cmd = None
+    cur_x = cur_y = start_x = start_y = 0.0
+    changed = False
+    for cmd, args in segments:
+        upper = cmd.upper()
+        count = _PATH_ARG_COUNTS[upper]
+        if (count == 0 and args) or (count and (not args or len(args) % count)):
+            return path_data
+        if count == 0:
+            out.append(cmd)
+            last_cmd = cmd
+            cur_x, cur_y = start_x, start_y
+            continue
+        
+        relative = cmd != upper
+        for i in range(0, len(args), count):
+            seg = args[i:i + count]
+            # Pairs after the first in a moveto are implicit linetos
+            seg_cmd = cmd
+            if upper == 'M' and i:
+                seg_cmd = 'l' if relative else 'L'
+            
+            if upper == 'H':
+                x = float(seg[0])
+                cur_x = cur_x + x if relative else x
+            elif upper == 'V':
+                y = float(seg[0])
+                cur_y = cur_y + y if relative else y
+            else:
+                x, y = float(seg[-2]), float(seg[-1])
+                if seg_cmd in ('L', 'l'):
+                    # Horizontal or vertical lines lose their unchanged coordinate
+                    if (y == 0) if relative else (y == cur_y):
+                        seg_cmd, seg = ('h' if relative else 'H'), seg[:1]
+                        changed = True
+                    elif (x == 0) if relative else (x == cur_x):
+                        seg_cmd, seg = ('v' if relative else 'V'), seg[1:]
+                        changed = True
+                if relative:
+                    x, y = cur_x + x, cur_y + y
+                cur_x, cur_y = x, y
+                if upper == 'M' and not i:
+                    start_x, start_y = x, y
+            
+            # Repeated commands stay implicit, except moveto (whose repeats mean lineto)
+            if seg_cmd != last_cmd or seg_cmd in ('M', 'm'):
+                out.append(seg_cmd)
+                last_cmd = seg_cmd
+            out.extend(seg)
+    
+    return ' '.join(out) if changed else path_data
+
+
+def optimize_paths(element):
+    """Compact the path data of every <path> in element's subtree."""
+    for el in element.iter():
+        if el.tag in _PATH_TAGS:
+            d = el.get('d')
+            if d:
+                compacted = compact_path_data(d)
+                if compacted is not d:
+                    el.set('d', compacted)
+
+
+def _rect_content_bounds(element, skip_background):
+    # Skip white background rectangles if requested
+    if skip_background and is_white_background(element):
+        return None
+    get = element.get
+    x = float(get('x', 0))
+    y = float(get('y', 0))
+    width = float(get('width', 0))
+    height = float(get('height', 0))
+    return (x, y, x + width, y + height)
+
+
+def _circle_content_bounds(element, skip_background):
+    get = element.get
+    cx = float(get('cx', 0))
+    cy = float(get('cy', 0))
+    r = float(get('r', 0))
+    return (cx - r, cy - r, cx + r, cy + r)
+
+
+def _ellipse_content_bounds(element, skip_background):
+    get = element.get
+    cx = float(get('cx', 0))
+    cy = float(get('cy', 0))
+    rx = float(get('rx', 0))
+    ry = float(get('ry', 0))
+    return (cx - rx, cy - ry, cx + rx, cy + ry)
+
+
+def _line_content_bounds(element, skip_background):
+    get = element.get
+    x1 = float(get('x1', 0))
+    y1 = float(get('y1', 0))
+    x2 = float(get('x2', 0))
+    y2 = float(get('y2', 0))
+    return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+
+def _poly_content_bounds(element, skip_background):
+    points_str = element.get('points', '')
+    return get_path_bounds(points_str) if points_str else None
+
+
+def _path_content_bounds(element, skip_background):
+    return get_path_bounds(element.get('d', ''))
+
+
+def _text_content_bounds(element, skip_background):
+    get = element.get
+    x = float(get('x', 0))
+    y = float(get('y', 0))
+    # Rough estimate for text bounds (actual rendering varies by font)
+    return (x, y - 10, x + 50, y + 5)
+
+
+# Bounds handlers keyed by full tag (namespaced and bare), so each element
+# costs one dict lookup instead of a namespace split and an if/elif chain
+_CONTENT_BOUNDS_HANDLERS = {
+    tag: handler
+    for name, handler in (('rect', _rect_content_bounds), ('circle', _circle_content_bounds),
+                          ('ellipse', _ellipse_content_bounds), ('line', _line_content_bounds),
+                          ('polyline', _poly_content_bounds), ('polygon', _poly_content_bounds),
+                          ('path', _path_content_bounds), ('text', _text_content_bounds))
+    for tag in (name, '{%s}%s' % (SVG_NS, name))
+}
+
+
 def get_content_bounds(element, transform=(0, 0, 1, 1), skip_background=False):
     """
-    Recursively calculate the actual content bounding box of SVG elements.
-    Returns (min_x, min_y, max_x, max_y) of visible content.
+    Calculate the actual content bounding box of an SVG element and its descendants.
+    Returns (min_x, min_y, max_x, max_y) of visible content, or None if there is none.
     
     Handles: rect, line, circle, ellipse, path, polygon, polyline, text, g (groups)
     Accounts for transforms: translate, scale, matrix
@@ -177,196 +414,91 @@ def get_content_bounds(element, transform=(0, 0, 1, 1), skip_background=False):
     - Focus on axes groups (id contains "axes")
     - Detect the actual plot area, not figure padding
     
+    The tree is walked with an explicit stack (no recursion), and each
+    element's bounds are merged into four local extremes by compare-and-assign.
+    
     Args:
         element: SVG element to process
         transform: Tuple of (tx, ty, sx, sy) for accumulated transforms
         skip_background: If True, skip white/background rectangles (useful for Matplotlib SVGs)
     """
-    tx, ty, sx, sy = transform
-    
-    # Parse element's own transform and combine with parent
-    elem_transform_str = element.get('transform', '')
-    if elem_transform_str:
-        etx, ety, esx, esy = parse_transform(elem_transform_str)
-        tx = tx + etx * sx
-        ty = ty + ety * sy
-        sx = sx * esx
-        sy = sy * esy
-    
-    # Get element tag without namespace
-    tag = element.tag.split('}')[-1] if '}' in element.tag else element.tag
-    
-    bounds = None
-    
-    # Handle different element types
-    if tag == 'rect':
-        # Skip white background rectangles if requested
-        if skip_background and is_white_background(element):
-            bounds = None
-        else:
-            x = float(element.get('x', 0))
-            y = float(element.get('y', 0))
-            width = float(element.get('width', 0))
-            height = float(element.get('height', 0))
-            bounds = (x, y, x + width, y + height)
-    
-    elif tag == 'circle':
-        cx = float(element.get('cx', 0))
-        cy = float(element.get('cy', 0))
-        r = float(element.get('r', 0))
-        bounds = (cx - r, cy - r, cx + r, cy + r)
-    
-    elif tag == 'ellipse':
-        cx = float(element.get('cx', 0))
-        cy = float(element.get('cy', 0))
-        rx = float(element.get('rx', 0))
-        ry = float(element.get('ry', 0))
-        bounds = (cx - rx, cy - ry, cx + rx, cy + ry)
-    
-    elif tag == 'line':
-        x1 = float(element.get('x1', 0))
-        y1 = float(element.get('y1', 0))
-        x2 = float(element.get('x2', 0))
-        y2 = float(element.get('y2', 0))
-        bounds = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
-    
-    elif tag == 'polyline' or tag == 'polygon':
-        points_str = element.get('points', '')
-        if points_str:
-            coords = re.findall(r'-?\d+\.?\d*', points_str)
-            if coords:
-                coords = [float(c) for c in coords]
-                x_coords = coords[0::2]
-                y_coords = coords[1::2]
-                if x_coords and y_coords:
-                    bounds = (min(x_coords), min(y_coords), max(x_coords), max(y_coords))
-    
-    elif tag == 'path':
-        d = element.get('d', '')
-        bounds = get_path_bounds(d)
-    
-    elif tag == 'text':
-        x = float(element.get('x', 0))
-        y = float(element.get('y', 0))
-        # Rough estimate for text bounds (actual rendering varies by font)
-        bounds = (x, y - 10, x + 50, y + 5)
-    
-    # Apply transform to bounds
-    if bounds:
-        min_x, min_y, max_x, max_y = bounds
-        min_x = min_x * sx + tx
-        min_y = min_y * sy + ty
-        max_x = max_x * sx + tx
-        max_y = max_y * sy + ty
-        bounds = (min_x, min_y, max_x, max_y)
-    
-    # Process child elements recursively
-    for child in element:
-        child_bounds = get_content_bounds(child, (tx, ty, sx, sy), skip_background)
-        if child_bounds:
-            if bounds:
-                # Merge bounds
-                bounds = (
-                    min(bounds[0], child_bounds[0]),
-                    min(bounds[1], child_bounds[1]),
-                    max(bounds[2], child_bounds[2]),
-                    max(bounds[3], child_bounds[3])
-                )
-            else:
-                bounds = child_bounds
+    # Accumulated bounds over all visited elements, kept in plain locals
+    acc_min_x = acc_min_y = float('inf')
+    acc_max_x = acc_max_y = float('-inf')
+    found = False
+    
+    # Bind hot lookups to locals; this loop runs once per element
+    _parse_transform = parse_transform
+    handlers = _CONTENT_BOUNDS_HANDLERS
+    
+    stack = [(element, transform)]
+    pop = stack.pop
+    push_children = stack.extend
+    while stack:
+        element, (tx, ty, sx, sy) = pop()
+        get = element.get
+        
+        # Parse element's own transform and combine with parent
+        elem_transform_str = get('transform', '')
+        if elem_transform_str:
+            etx, ety, esx, esy = _parse_transform(elem_transform_str)
+            tx = tx + etx * sx
+            ty = ty + ety * sy
+            sx = sx * esx
+            sy = sy * esy
+        
+        # One dict lookup on the full tag picks the shape's bounds handler
+        handler = handlers.get(element.tag)
+        bounds = handler(element, skip_background) if handler else None
+        
+        # Apply transform to bounds and merge into the accumulator
+        if bounds:
+            found = True
+            min_x, min_y, max_x, max_y = bounds
+            min_x = min_x * sx + tx
+            min_y = min_y * sy + ty
+            max_x = max_x * sx + tx
+            max_y = max_y * sy + ty
+            if min_x < acc_min_x:
+                acc_min_x = min_x
+            if min_y < acc_min_y:
+                acc_min_y = min_y
+            if max_x > acc_max_x:
+                acc_max_x = max_x
+            if max_y > acc_max_y:
+                acc_max_y = max_y
+        
+        # Queue child elements with the combined transform
+        if len(element):
+            child_transform = (tx, ty, sx, sy)
+            push_children((child, child_transform) for child in element)
     
-    return bounds
+    if not found:
+        return None
+    return (acc_min_x, acc_min_y, acc_max_x, acc_max_y)
 
 
-def crop_svg_to_content(svg_root, skip_background=False):
+def compute_layout(panel_dims, args):
     """
-    Crop an SVG to its actual content bounds, removing excess whitespace.
-    Returns (cropped_root, width, height) with content starting at (0,0).
-    
-    Args:
-        svg_root: The root SVG element
-        skip_background: If True, skip white background rectangles when calculating bounds
+    Place panels on the grid.
+    Returns ([(x, y) per panel], total_width, total_height).
     """
-    # Get content bounds
-    bounds = get_content_bounds(svg_root, skip_background=skip_background)
-    
-    if not bounds:
-        # No content found, return original
-        width, height = parse_svg_dimensions(svg_root)
-        return svg_root, width or 0, height or 0
-    
-    min_x, min_y, max_x, max_y = bounds
-    content_width = max_x - min_x
-    content_height = max_y - min_y
-    
-    # Create new root with adjusted viewBox
-    # The viewBox starts at min_x, min_y and shows content_width x content_height
-    # This effectively crops to the content bounds
-    svg_ns = "http://www.w3.org/2000/svg"
-    new_root = ET.Element('{%s}svg' % svg_ns, {
-        'width': f'{content_width}',
-        'height': f'{content_height}',
-        'viewBox': f'{min_x} {min_y} {content_width} {content_height}'
-    })
-    
-    # Copy attributes except width, height, viewBox
-    for attr, value in svg_root.attrib.items():
-        if attr not in ['width', 'height', 'viewBox']:
-            new_root.set(attr, value)
-    
-    # Copy all child elements
-    for child in svg_root:
-        new_root.append(child)
-    
-    return new_root, content_width, content_height
-
-
-def create_composite_svg(panels, output_path, args):
-    """Create a composite SVG from multiple panel SVGs."""
-    # Load all panel SVGs
-    panel_trees = []
-    for panel_file in panels:
-        try:
-            tree = ET.parse(panel_file)
-            panel_trees.append((panel_file, tree))
-        except Exception as e:
-            print(f"Error loading {panel_file}: {e}", file=sys.stderr)
-            continue
-    
-    if not panel_trees:
-        print("No valid panels to process", file=sys.stderr)
-        return False
-    
     # Calculate layout
-    num_panels = len(panel_trees)
+    num_panels = len(panel_dims)
     max_per_row = args.max_per_row
     num_rows = (num_panels + max_per_row - 1) // max_per_row
     num_cols = min(num_panels, max_per_row)
     
-    # Crop panels if requested
-    if hasattr(args, 'crop') and args.crop:
-        # When --crop is used, automatically enable skip-background behavior
-        # This is the expected behavior for Matplotlib figures with white backgrounds
-        # The --skip-background flag is provided for explicit documentation but has the same effect
-        skip_bg = True
-        
-        cropped_trees = []
-        for panel_file, tree in panel_trees:
-            cropped_root, width, height = crop_svg_to_content(tree.getroot(), skip_background=skip_bg)
-            # Create new tree with cropped root
-            new_tree = ET.ElementTree(cropped_root)
-            cropped_trees.append((panel_file, new_tree))
-        panel_trees = cropped_trees
-    
-    # Get panel dimensions
-    panel_dims = []
-    for _, tree in panel_trees:
-        width, height = parse_svg_dimensions(tree.getroot())
-        panel_dims.append((width or 0, height or 0))
-    
-    # Calculate max dimensions per row/column
-    max_width = max(w for w, h in panel_dims) if panel_dims else 0
-    max_height = max(h for w, h in panel_dims) if panel_dims else 0
+    # Calculate max and total dimensions in a single pass
+    max_width = max_height = 0
+    sum_width = sum_height = 0
+    for w, h in panel_dims:
+        if w > max_width:
+            max_width = w
+        if h > max_height:
+            max_height = h
+        sum_width += w
+        sum_height += h
     
     # Calculate gaps based on options
     col_gap = args.col_gap
@@ -378,8 +510,8 @@ def create_composite_svg(panels, output_path, args):
         row_gap = 0
     # Apply --gap-ratio option (proportional gaps)
     elif hasattr(args, 'gap_ratio') and args.gap_ratio is not None:
-        avg_width = sum(w for w, h in panel_dims) / len(panel_dims) if panel_dims else 0
-        avg_height = sum(h for w, h in panel_dims) / len(panel_dims) if panel_dims else 0
+        avg_width = sum_width / num_panels if panel_dims else 0
+        avg_height = sum_height / num_panels if panel_dims else 0
         col_gap = avg_width * args.gap_ratio
         row_gap = avg_height * args.gap_ratio
     
@@ -387,10 +519,9 @@ def create_composite_svg(panels, output_path, args):
     if args.outer_publisher and args.outer_layout:
         publisher = args.outer_publisher
         layout = args.outer_layout
-        if publisher in PUBLISHER_SIZES and layout in PUBLISHER_SIZES[publisher]:
-            target_width_mm, _ = PUBLISHER_SIZES[publisher][layout]
-            if target_width_mm:
-                target_width_px = mm_to_px(target_width_mm)
+        if publisher in PUBLISHER_SIZES_PX and layout in PUBLISHER_SIZES_PX[publisher]:
+            target_width_px, _ = PUBLISHER_SIZES_PX[publisher][layout]
+            if target_width_px:
                 # Calculate scale factor
                 total_content_width = num_cols * max_width + (num_cols - 1) * col_gap
                 scale = target_width_px / total_content_width if total_content_width > 0 else 1.0
@@ -401,49 +532,302 @@ def create_composite_svg(panels, output_path, args):
     total_width = num_cols * max_width + (num_cols - 1) * col_gap + 2 * args.outer_pad
     total_height = num_rows * max_height + (num_rows - 1) * row_gap + 2 * args.outer_pad
     
-    # Create root SVG
-    svg_ns = "http://www.w3.org/2000/svg"
-    ET.register_namespace('', svg_ns)
-    root = ET.Element('{%s}svg' % svg_ns, {
-        'width': f'{total_width}',
-        'height': f'{total_height}',
-        'viewBox': f'0 0 {total_width} {total_height}'
-    })
-    
-    # Add panels
-    for idx, (panel_file, tree) in enumerate(panel_trees):
-        row = idx // max_per_row
-        col = idx % max_per_row
+    # Every panel in a column shares its x and every panel in a row its y,
+    # so compute each offset once and index into them
+    col_xs = [args.outer_pad + col * (max_width + col_gap) for col in range(num_cols)]
+    row_ys = [args.outer_pad + row * (max_height + row_gap) for row in range(num_rows)]
+    positions = [(col_xs[idx % max_per_row], row_ys[idx // max_per_row])
+                 for idx in range(num_panels)]
+    
+    return positions, total_width, total_height
+
+
+def panel_label_setup(args, count):
+    """
+    Return (labels, label_attrs) for count panels: the label text of each
+    panel, starting at --panel-label-first, and the attributes shared by
+    every label element.
+    """
+    first = ord(args.panel_label_first)
+    labels = [chr(first + idx) for idx in range(count)]
+    label_attrs = dict(_LABEL_ATTRS)
+    label_attrs['font-size'] = str(args.panel_label_font_size)
+    return labels, label_attrs
+
+
+def split_svg_markup(data):
+    """
+    Split raw SVG bytes into (root attributes, {prefix: namespace uri}, body).
+    The whole file is run through expat without building a tree, which
+    checks that it is well-formed and gives the root start tag's exact
+    position; body is the markup between the root's start and end tags.
+    Raises expat.ExpatError on malformed markup or an undeclared prefix.
+    Returns None when the file cannot be spliced safely into another
+    document (non UTF-8 encoding, entity declarations, unexpected root).
+    """
+    if data.startswith(codecs.BOM_UTF8):
+        data = data[len(codecs.BOM_UTF8):]
+    
+    encoding = _XML_ENCODING_RE.match(data)
+    if encoding and encoding.group(1).lower() not in (b'utf-8', b'utf8', b'us-ascii', b'ascii'):
+        return None
+    
+    namespaces = {}
+    root = []
+    
+    def start_namespace(prefix, uri):
+        # Declarations reported before the first element belong to the root
+        namespaces[(prefix or '').encode()] = escape(uri, {'"': '&quot;'}).encode()
+    
+    def start_element(name, attrib):
+        root.extend((parser.CurrentByteIndex, name, attrib))
+        parser.StartElementHandler = parser.StartNamespaceDeclHandler = None
+    
+    parser = expat.ParserCreate(namespace_separator=' ')
+    parser.StartNamespaceDeclHandler = start_namespace
+    parser.StartElementHandler = start_element
+    parser.Parse(data, True)
+    
+    start, name, root_attrib = root
+    # Expat has checked the file, so a quote-aware match from the root's
+    # position spans exactly its start tag (a prefixed or empty root fails)
+    open_tag = _SVG_START_TAG_RE.match(data, start)
+    if open_tag is None or b'<!ENTITY' in data[:start]:
+        return None
+    if name != SVG_NS + ' svg' or namespaces.get(b'') != SVG_NS.encode():
+        return None
+    
+    # Nothing but the root's end tag can close a well-formed file with </svg>
+    end = len(data.rstrip())
+    if not data.endswith(b'</svg>', open_tag.end(), end):
+        return None
+    
+    return root_attrib, namespaces, data[open_tag.end():end - len(b'</svg>')]
+
+
+def create_composite_svg_fast(panels, output_path, args):
+    """
+    Create a composite SVG by splicing the panel files' markup directly.
+    Panels are never parsed into trees: each file is checked for
+    well-formedness and its body copied between a positioned <g> wrapper.
+    Returns False, without writing anything, when a panel is malformed or
+    cannot be spliced; create_composite_svg then takes the tree path.
+    """
+    if not panels:
+        return False
+    
+    namespaces = {}
+    bodies = []
+    panel_dims = []
+    for panel_file in panels:
+        try:
+            with open(panel_file, 'rb') as f:
+                split = split_svg_markup(f.read())
+        except Exception:
+            return False
         
-        x = args.outer_pad + col * (max_width + col_gap)
-        y = args.outer_pad + row * (max_height + row_gap)
+        if split is None:
+            return False
+        root_attrib, panel_namespaces, body = split
+        width, height = parse_svg_dimensions(root_attrib)
+        for prefix, uri in panel_namespaces.items():
+            if namespaces.setdefault(prefix, uri) != uri:
+                return False
         
-        # Create group for panel
-        group = ET.SubElement(root, 'g', {
-            'transform': f'translate({x}, {y})'
-        })
+        bodies.append(body)
+        panel_dims.append((width or 0, height or 0))
+    
+    positions, total_width, total_height = compute_layout(panel_dims, args)
+    
+    ns_attrs = b''.join(b' xmlns%s="%s"' % (b':' + prefix if prefix else b'', uri)
+                        for prefix, uri in namespaces.items())
+    parts = [
+        b"<?xml version='1.0' encoding='utf-8'?>\n",
+        b'<svg%s width="%s" height="%s" viewBox="0 0 %s %s">' % (
+            ns_attrs, *(str(v).encode() for v in (total_width, total_height, total_width, total_height))),
+    ]
+    if args.add_panel_label:
+        labels, label_attrs = panel_label_setup(args, len(bodies))
+        label_open = '<text%s>' % ''.join(f' {name}={quoteattr(value)}'
+                                          for name, value in label_attrs.items())
+    for idx, (body, (x, y)) in enumerate(zip(bodies, positions)):
+        if x or y:
+            parts.append(f'<g transform="translate({x}, {y})">'.encode())
+        else:
+            parts.append(b'<g>')
+        parts.append(body)
+        if args.add_panel_label:
+            parts.append(f'{label_open}{escape(labels[idx])}</text>'.encode())
+        parts.append(b'</g>')
+    parts.append(b'</svg>')
+    
+    with open(output_path, 'wb') as f:
+        f.write(b''.join(parts))
+    print(f"Composite SVG written to: {output_path}")
+    return True
+
+
+def load_panel_tree(svg_path):
+    """
+    Parse a panel SVG, reusing earlier work if the file is unchanged.
+    Returns (tree, (width, height)). Callers get their own tree, since
+    composing modifies the panel's root. Repeat loads parse the cached,
+    already stripped serialization instead of the file.
+    """
+    key = os.path.abspath(svg_path)
+    stat = os.stat(svg_path)
+    with _PANEL_CACHE_LOCK:
+        cached = _PANEL_CACHE.pop(key, None)
+    if cached is not None and cached[:2] != (stat.st_mtime, stat.st_size):
+        cached = None
+    
+    if cached is not None and cached[2] is not None:
+        tree = load_svg_tree(io.BytesIO(cached[2]))
+        dims = cached[3]
+        pristine = cached[2]
+    else:
+        tree = load_svg_tree(svg_path)
+        dims = parse_svg_dimensions(tree.getroot())
+        # Second load of an unchanged file: keep it serialized for later loads
+        pristine = ET.tostring(tree.getroot()) if cached is not None else None
+    
+    with _PANEL_CACHE_LOCK:
+        _PANEL_CACHE[key] = (stat.st_mtime, stat.st_size, pristine, dims)
+        while len(_PANEL_CACHE) > _PANEL_CACHE_SIZE:
+            del _PANEL_CACHE[next(iter(_PANEL_CACHE))]
+    return tree, dims
+
+
+def try_load_and_crop(svg_path, crop=False):
+    """
+    Parse a panel SVG and, with crop, measure its content bounds.
+    Returns ((tree, (width, height), (origin_x, origin_y)), None) or
+    (None, error). The origin is the point placed at the panel's layout slot:
+    the content's top-left corner when cropping, otherwise (0, 0).
+    Without crop only the root tag is read and tree is None; the full
+    parse, and the report of a malformed file, is deferred until the panel
+    is written.
+    """
+    try:
+        if not crop:
+            width, height = read_svg_dimensions(svg_path)
+            return (None, (width or 0, height or 0), (0, 0)), None
+        
+        tree, (width, height) = load_panel_tree(svg_path)
+        # Cropping always skips white backgrounds (see --skip-background)
+        bounds = get_content_bounds(tree.getroot(), skip_background=True)
+        if bounds:
+            min_x, min_y, max_x, max_y = bounds
+            return (tree, (max_x - min_x, max_y - min_y), (min_x, min_y)), None
+        # No content found: keep the size read when loading
+        return (tree, (width or 0, height or 0), (0, 0)), None
+    except Exception as e:
+        return None, e
+
+
+def create_composite_svg(panels, output_path, args):
+    """Create a composite SVG from multiple panel SVGs."""
+    # Plain composites can splice panel markup without building trees
+    if not (getattr(args, 'crop', False) or getattr(args, 'pretty', False)
+            or getattr(args, 'optimize_paths', False)):
+        if create_composite_svg_fast(panels, output_path, args):
+            return True
+    
+    # When --crop is used, automatically enable skip-background behavior
+    # This is the expected behavior for Matplotlib figures with white backgrounds
+    # The --skip-background flag is provided for explicit documentation but has the same effect
+    cropped = hasattr(args, 'crop') and args.crop
+    
+    # Load (and crop) all panel SVGs in parallel; results come back in input
+    # order. Cropping is folded into placement: each worker measures the
+    # content bounds once, and the panel group is later shifted by -min_x,
+    # -min_y instead of building a cropped copy of the root.
+    # The pool stays open until the output is written, so no lxml tree is
+    # used after the thread that parsed it has exited; _PANEL_CACHE keeps
+    # serialized bytes, not trees, so none are shared across calls either.
+    load = functools.partial(try_load_and_crop, crop=cropped)
+    with ThreadPoolExecutor(max_workers=max(1, min(len(panels), os.cpu_count() or 1))) as executor:
+        results = list(executor.map(load, panels))
+        
+        panel_trees = []
+        panel_dims = []
+        panel_origins = []
+        for panel_file, (loaded, error) in zip(panels, results):
+            if error is not None:
+                print(f"Error loading {panel_file}: {error}", file=sys.stderr)
+                continue
+            tree, dims, origin = loaded
+            panel_trees.append((panel_file, tree))
+            panel_dims.append(dims)
+            panel_origins.append(origin)
         
-        # Copy panel content
-        panel_root = tree.getroot()
-        for child in panel_root:
-            group.append(child)
+        if not panel_trees:
+            print("No valid panels to process", file=sys.stderr)
+            return False
+        
+        positions, total_width, total_height = compute_layout(panel_dims, args)
         
-        # Add panel label if requested
         if args.add_panel_label:
-            label_char = chr(ord(args.panel_label_first) + idx)
-            label = ET.SubElement(group, 'text', {
-                'x': '5',
-                'y': '15',
-                'font-size': str(args.panel_label_font_size),
-                'font-weight': 'bold',
-                'font-family': 'Arial, sans-serif'
-            })
-            label.text = label_char
-    
-    # Write output
-    tree = ET.ElementTree(root)
-    ET.indent(tree, space='  ')
-    tree.write(output_path, encoding='utf-8', xml_declaration=True)
+            labels, label_attrs = panel_label_setup(args, len(panel_trees))
+        
+        written = 0
+        
+        def panel_groups():
+            nonlocal written
+            for idx, ((x, y), (origin_x, origin_y)) in enumerate(zip(positions, panel_origins)):
+                panel_file, tree = panel_trees[idx]
+                # Drop the list's reference so each panel can be freed once written
+                panel_trees[idx] = None
+                if tree is None:
+                    # Uncropped panels are only parsed now, one at a time
+                    try:
+                        tree, _ = load_panel_tree(panel_file)
+                    except Exception as e:
+                        print(f"Error loading {panel_file}: {e}", file=sys.stderr)
+                        continue
+                
+                # The panel's own root becomes its group: its attributes are
+                # replaced and it is serialized in place, so no nodes are moved
+                # between documents (slow with lxml, and unsafe for trees parsed
+                # in worker threads)
+                group = tree.getroot()
+                group.attrib.clear()
+                group.text = None
+                # Keep the root's namespace (or lack of one) for the new tags
+                svg_ns = group.tag[:group.tag.rfind('}') + 1]
+                group.tag = svg_ns + 'g'
+                
+                # Move the panel's content origin to the layout slot
+                # (an identity translate is left off)
+                offset_x = x - origin_x
+                offset_y = y - origin_y
+                if offset_x or offset_y:
+                    group.set('transform', f'translate({offset_x}, {offset_y})')
+                
+                # Add panel label if requested
+                if args.add_panel_label:
+                    label = ET.SubElement(group, svg_ns + 'text', label_attrs)
+                    label.text = labels[idx]
+                
+                # With --align the compaction waits until after alignment, which
+                # reads path data as plain x,y pairs
+                if getattr(args, 'optimize_paths', False) and not getattr(args, 'align', False):
+                    optimize_paths(group)
+                written += 1
+                yield group
+        
+        # Write the root SVG and stream each panel group into it as it is built
+        write_svg_stream({
+            'width': f'{total_width}',
+            'height': f'{total_height}',
+            'viewBox': f'0 0 {total_width} {total_height}'
+        }, panel_groups(), output_path, pretty=getattr(args, 'pretty', False))
+    
+    if not written:
+        # Every panel failed when it was parsed for writing
+        os.remove(output_path)
+        print("No valid panels to process", file=sys.stderr)
+        return False
     print(f"Composite SVG written to: {output_path}")
     return True
 
@@ -487,6 +871,11 @@ def main():
     parser.add_argument('--align-yspine-equalize', action='store_true', help='Equalize y-axis spine lengths')
     parser.add_argument('--auto-match-scale', action='store_true', help='Normalize scales if inputs differ')
     
+    # Output options
+    parser.add_argument('--pretty', action='store_true', help='Indent the output SVG for readability')
+    parser.add_argument('--optimize-paths', action='store_true',
+                        help='Rewrite horizontal/vertical path lines as H/V commands to shrink the output')
+    
     args = parser.parse_args()
     
     # Create composite SVG
@@ -502,6 +891,14 @@ def main():
             print("Warning: align_axes module not found, skipping alignment", file=sys.stderr)
         except Exception as e:
             print(f"Warning: Alignment failed: {e}", file=sys.stderr)
+        
+        if args.optimize_paths:
+            try:
+                tree = load_svg_tree(args.output)
+                optimize_paths(tree.getroot())
+                write_svg_tree(tree, args.output, pretty=args.pretty)
+            except Exception as e:
+                print(f"Warning: Path optimization failed: {e}", file=sys.stderr)
     
     return 0 if success else 1
 
@@ -5,56 +5,18 @@ Fits SVG panels into publisher-specified dimensions with optional scaling.
 """
 
 import argparse
-import xml.etree.ElementTree as ET
 import sys
 
-
-# Publisher dimensions in millimeters
-PUBLISHER_SIZES = {
-    'ieee-access': {'single': (88.9, None), 'double': (183.0, None), 'full': (183.0, None)},
-    'ieee-trans': {'single': (88.9, None), 'double': (183.0, None), 'full': (183.0, None)},
-    'ieee-proc': {'single': (88.9, None), 'double': (183.0, None), 'full': (183.0, None)},
-    'nature': {'single': (89.0, None), 'double': (183.0, None), 'full': (247.0, None)},
-}
-
-
-def mm_to_px(mm):
-    """Convert millimeters to pixels at 90 DPI."""
-    return mm * 90.0 / 25.4
-
-
-def px_to_mm(px):
-    """Convert pixels to millimeters at 90 DPI."""
-    return px * 25.4 / 90.0
-
-
-def parse_svg_dimensions(svg_root):
-    """Extract width and height from SVG root element."""
-    width_str = svg_root.get('width', '').replace('pt', '').replace('px', '')
-    height_str = svg_root.get('height', '').replace('pt', '').replace('px', '')
-    
-    try:
-        width = float(width_str) if width_str else None
-        height = float(height_str) if height_str else None
-    except ValueError:
-        width, height = None, None
-    
-    # Fallback to viewBox
-    if width is None or height is None:
-        viewbox = svg_root.get('viewBox', '')
-        if viewbox:
-            parts = viewbox.split()
-            if len(parts) == 4:
-                width = float(parts[2])
-                height = float(parts[3])
-    
-    return width, height
+from _svg_common import (
+    ET, SVG_NS, PUBLISHER_SIZES_PX, px_to_mm, parse_svg_dimensions,
+    load_svg_tree, write_svg_tree,
+)
 
 
 def frame_panel(input_path, output_path, args):
     """Frame a panel to fit publisher specifications."""
     try:
-        tree = ET.parse(input_path)
+        tree = load_svg_tree(input_path)
         root = tree.getroot()
         
         # Get current dimensions
@@ -69,12 +31,10 @@ def frame_panel(input_path, output_path, args):
             publisher = args.outer_publisher
             layout = args.outer_layout
             
-            if publisher in PUBLISHER_SIZES and layout in PUBLISHER_SIZES[publisher]:
-                target_width_mm, target_height_mm = PUBLISHER_SIZES[publisher][layout]
+            if publisher in PUBLISHER_SIZES_PX and layout in PUBLISHER_SIZES_PX[publisher]:
+                target_width, target_height = PUBLISHER_SIZES_PX[publisher][layout]
                 
-                if target_width_mm:
-                    target_width = mm_to_px(target_width_mm)
-                    
+                if target_width:
                     # Calculate scale factor
                     scale = target_width / current_width
                     
@@ -82,22 +42,23 @@ def frame_panel(input_path, output_path, args):
                     new_width = target_width
                     new_height = current_height * scale
                     
-                    # Update SVG dimensions
-                    root.set('width', str(new_width))
-                    root.set('height', str(new_height))
-                    root.set('viewBox', f'0 0 {new_width} {new_height}')
+                    # Update SVG dimensions (left untouched when already at the target size)
+                    if new_width != current_width or new_height != current_height:
+                        root.set('width', str(new_width))
+                        root.set('height', str(new_height))
+                        root.set('viewBox', f'0 0 {new_width} {new_height}')
                     
                     # Scale content if needed
                     if abs(scale - 1.0) > 0.01:
                         # Wrap existing content in a scaled group
-                        content_group = ET.Element('g', {
+                        content_group = ET.Element('{%s}g' % SVG_NS, {
                             'transform': f'scale({scale})'
                         })
                         
-                        # Move all children to the new group
-                        for child in list(root):
-                            root.remove(child)
-                            content_group.append(child)
+                        # Move all children to the new group in bulk
+                        children = list(root)
+                        root[:] = []
+                        content_group.extend(children)
                         
                         root.append(content_group)
                     
@@ -105,8 +66,7 @@ def frame_panel(input_path, output_path, args):
                           f"to {px_to_mm(new_width):.1f}mm x {px_to_mm(new_height):.1f}mm")
         
         # Write output
-        ET.indent(tree, space='  ')
-        tree.write(output_path, encoding='utf-8', xml_declaration=True)
+        write_svg_tree(tree, output_path, pretty=getattr(args, 'pretty', False))
         print(f"Framed panel written to: {output_path}")
         return True
         
@@ -127,6 +87,7 @@ def main():
     parser.add_argument('--outer-layout', 
                         choices=['single', 'double', 'full'],
                         required=True, help='Column layout')
+    parser.add_argument('--pretty', action='store_true', help='Indent the output SVG for readability')
     
     args = parser.parse_args()
     
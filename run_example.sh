@@ -18,6 +18,7 @@ echo "Step 1: Verifying all scripts compile correctly..."
 python3 -m py_compile main.py
 python3 -m py_compile align_axes.py
 python3 -m py_compile panel_frame_fit.py
+python3 -m py_compile _svg_common.py
 python3 -m py_compile extras/extract_panel_svg_og.py
 echo "✓ All scripts compile successfully"
 echo ""
@@ -0,0 +1,69 @@
+"""Regression checks for align_axes.py on real matplotlib output."""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import align_axes  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def _args(**overrides):
+    args = argparse.Namespace(align_mode='patch-bottom', align_xspine_equalize=False,
+                              align_yspine_equalize=False, pretty=False)
+    for name, value in overrides.items():
+        setattr(args, name, value)
+    return args
+
+
+def _groups_by_id(root):
+    return {el.get('id'): el for el in root.iter() if el.get('id')}
+
+
+class PatchBottomAlignmentTest(unittest.TestCase):
+    """A figure saved by matplotlib with two axes at different heights."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.svg_path = os.path.join(self.tmpdir, 'figure.svg')
+        shutil.copy(os.path.join(DATA_DIR, 'matplotlib_two_axes.svg'), self.svg_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_axes_patch_bottoms_are_aligned(self):
+        before = _groups_by_id(align_axes.load_svg_tree(self.svg_path).getroot())
+        self.assertGreater(abs(align_axes.get_patch_max_y(before['axes_1'])
+                               - align_axes.get_patch_max_y(before['axes_2'])), 0.1)
+
+        self.assertTrue(align_axes.align_svg_panels(self.svg_path, _args()))
+
+        after = _groups_by_id(align_axes.load_svg_tree(self.svg_path).getroot())
+        self.assertAlmostEqual(align_axes.get_patch_max_y(after['axes_1']),
+                               align_axes.get_patch_max_y(after['axes_2']), places=6)
+
+    def test_output_has_only_finite_transforms(self):
+        self.assertTrue(align_axes.align_svg_panels(self.svg_path, _args()))
+
+        with open(self.svg_path, encoding='utf-8') as f:
+            data = f.read()
+        self.assertNotIn('inf', data)
+        self.assertNotIn('nan', data)
+
+    def test_axis_groups_without_patch_are_not_moved(self):
+        self.assertTrue(align_axes.align_svg_panels(self.svg_path, _args()))
+
+        after = _groups_by_id(align_axes.load_svg_tree(self.svg_path).getroot())
+        for group_id, group in after.items():
+            if group_id.startswith('matplotlib.axis_'):
+                self.assertIsNone(group.get('transform'), group_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+"""Regression checks for composing panels with main.py."""
+
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import xml.etree.ElementTree as StdET
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+ATTRIBUTE_WITH_GT = b'''<?xml version="1.0" encoding="utf-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" aria-label="x > y" width="20" height="10"><rect x="1" y="1" width="5" height="5"/></svg>
+'''
+
+COMMENT_WITH_SVG_TAG = b'''<?xml version="1.0"?>
+<!-- copied from <svg xmlns="http://www.w3.org/2000/svg"> -->
+<svg xmlns="http://www.w3.org/2000/svg" width="20" height="10"><rect x="2" y="2" width="5" height="5"/></svg>
+'''
+
+
+def _canonical(element):
+    """Element tree as nested tuples, ignoring whitespace-only text and tails."""
+    return (element.tag, sorted(element.attrib.items()), (element.text or '').strip(),
+            [_canonical(child) for child in element])
+
+
+def _args(**overrides):
+    args = argparse.Namespace(
+        outer_publisher=None, outer_layout=None, max_per_row=2, col_gap=10.0, row_gap=10.0,
+        outer_pad=10.0, crop=False, skip_background=False, tight=False, gap_ratio=None,
+        add_panel_label=False, panel_label_first='a', panel_label_font_size=12,
+        align=False, align_mode='xlabel', align_xspine_equalize=False,
+        align_yspine_equalize=False, auto_match_scale=False, pretty=False, optimize_paths=False)
+    for name, value in overrides.items():
+        setattr(args, name, value)
+    return args
+
+
+class CompositeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.output = os.path.join(self.tmpdir, 'composite.svg')
+        # Keep the progress messages out of the test report
+        stdout = mock.patch('sys.stdout', new_callable=io.StringIO)
+        stdout.start()
+        self.addCleanup(stdout.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_panel(self, name, data):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+
+class FastPathSpliceTest(CompositeTestCase):
+    """The splice path must cut each panel at its real root tag."""
+
+    def assert_spliced_rects(self, panels):
+        self.assertTrue(main.create_composite_svg_fast(panels, self.output, _args()))
+        root = StdET.parse(self.output).getroot()
+        groups = list(root)
+        self.assertEqual(len(groups), len(panels))
+        for group in groups:
+            self.assertEqual(group.tag, '{%s}g' % SVG_NS)
+            self.assertFalse((group.text or '').strip())
+            self.assertEqual([child.tag for child in group], ['{%s}rect' % SVG_NS])
+
+    def test_root_attribute_containing_gt(self):
+        panel = self.write_panel('gt.svg', ATTRIBUTE_WITH_GT)
+        self.assert_spliced_rects([panel, panel])
+
+    def test_comment_containing_svg_tag_before_root(self):
+        panel = self.write_panel('comment.svg', COMMENT_WITH_SVG_TAG)
+        self.assert_spliced_rects([panel, panel])
+
+    def test_malformed_panel_is_not_spliced(self):
+        good = self.write_panel('good.svg', COMMENT_WITH_SVG_TAG)
+        bad = self.write_panel('bad.svg', ATTRIBUTE_WITH_GT.replace(b'</svg>', b'<g></svg>'))
+        self.assertFalse(main.create_composite_svg_fast([good, bad], self.output, _args()))
+        self.assertFalse(os.path.exists(self.output))
+
+
+class FastPathMatchesTreePathTest(CompositeTestCase):
+    """Splicing raw markup must give the same document as the tree path."""
+
+    def compose_both_ways(self, panels, **overrides):
+        args = _args(**overrides)
+        self.assertTrue(main.create_composite_svg_fast(panels, self.output, args))
+        fast = StdET.parse(self.output).getroot()
+        with mock.patch.object(main, 'create_composite_svg_fast', return_value=False):
+            self.assertTrue(main.create_composite_svg(panels, self.output, args))
+        tree = StdET.parse(self.output).getroot()
+        self.assertEqual(_canonical(fast), _canonical(tree))
+
+    def test_matplotlib_panels(self):
+        panel = os.path.join(DATA_DIR, 'matplotlib_two_axes.svg')
+        self.compose_both_ways([panel, panel, panel])
+
+    def test_labels_and_layout_options(self):
+        panel = os.path.join(DATA_DIR, 'matplotlib_two_axes.svg')
+        self.compose_both_ways([panel, panel, panel], add_panel_label=True, max_per_row=3)
+        self.compose_both_ways([panel, panel], add_panel_label=True, tight=True,
+                               panel_label_first='c', panel_label_font_size=9)
+        self.compose_both_ways([panel, panel], gap_ratio=0.05, outer_pad=0.0)
+
+    def test_root_tag_edge_cases(self):
+        self.compose_both_ways([self.write_panel('gt.svg', ATTRIBUTE_WITH_GT),
+                                self.write_panel('comment.svg', COMMENT_WITH_SVG_TAG)])
+
+
+class PanelCacheTest(CompositeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        main._PANEL_CACHE.clear()
+
+    def tearDown(self):
+        main._PANEL_CACHE.clear()
+        super().tearDown()
+
+    def test_more_panels_than_cache_size_with_crop(self):
+        count = 4 * main._PANEL_CACHE_SIZE
+        panels = [self.write_panel(f'panel_{i}.svg', COMMENT_WITH_SVG_TAG) for i in range(count)]
+        # Repeat so the panels hit the cache and evict each other concurrently
+        for _ in range(3):
+            self.assertTrue(main.create_composite_svg(panels, self.output, _args(crop=True)))
+            self.assertEqual(len(StdET.parse(self.output).getroot()), count)
+        self.assertLessEqual(len(main._PANEL_CACHE), main._PANEL_CACHE_SIZE)
+
+    def cache_entry(self, path):
+        return main._PANEL_CACHE[os.path.abspath(path)]
+
+    def test_copy_is_kept_from_the_second_load(self):
+        panel = self.write_panel('panel.svg', COMMENT_WITH_SVG_TAG)
+        first, dims = main.load_panel_tree(panel)
+        self.assertEqual(dims, (20.0, 10.0))
+        self.assertIsNone(self.cache_entry(panel)[2])
+
+        main.load_panel_tree(panel)
+        self.assertIsInstance(self.cache_entry(panel)[2], bytes)
+
+    def test_cached_loads_are_independent(self):
+        panel = self.write_panel('panel.svg', COMMENT_WITH_SVG_TAG)
+        trees = [main.load_panel_tree(panel)[0] for _ in range(4)]
+        expected = _canonical(StdET.fromstring(COMMENT_WITH_SVG_TAG))
+        for tree in trees:
+            self.assertEqual(_canonical(tree.getroot()), expected)
+            # Composing modifies the root; later loads must not see it
+            tree.getroot().clear()
+        self.assertEqual(_canonical(main.load_panel_tree(panel)[0].getroot()), expected)
+
+    def test_changed_file_is_reparsed(self):
+        panel = self.write_panel('panel.svg', COMMENT_WITH_SVG_TAG)
+        main.load_panel_tree(panel)
+        main.load_panel_tree(panel)
+        self.write_panel('panel.svg', COMMENT_WITH_SVG_TAG.replace(b'width="20"', b'width="200"'))
+        tree, dims = main.load_panel_tree(panel)
+        self.assertEqual(dims, (200.0, 10.0))
+        self.assertEqual(tree.getroot().get('width'), '200')
+        self.assertIsNone(self.cache_entry(panel)[2])
+
+    def test_least_recently_used_panel_is_evicted(self):
+        panels = [self.write_panel(f'panel_{i}.svg', COMMENT_WITH_SVG_TAG)
+                  for i in range(main._PANEL_CACHE_SIZE + 1)]
+        for panel in panels[:-1]:
+            main.load_panel_tree(panel)
+        main.load_panel_tree(panels[0])
+        main.load_panel_tree(panels[-1])
+        self.assertIn(os.path.abspath(panels[0]), main._PANEL_CACHE)
+        self.assertNotIn(os.path.abspath(panels[1]), main._PANEL_CACHE)
+
+    def test_concurrent_loads_past_cache_size(self):
+        count = 4 * main._PANEL_CACHE_SIZE
+        panels = [self.write_panel(f'panel_{i}.svg', COMMENT_WITH_SVG_TAG) for i in range(count)]
+        # Switch threads as often as possible to interleave the cache updates
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(main.load_panel_tree, panels * 20))
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual({dims for _, dims in results}, {(20.0, 10.0)})
+        self.assertLessEqual(len(main._PANEL_CACHE), main._PANEL_CACHE_SIZE)
+
+
+if __name__ == '__main__':
+    unittest.main()
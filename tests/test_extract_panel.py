@@ -0,0 +1,104 @@
+"""Regression checks for extras/extract_panel_svg_og.py."""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import xml.etree.ElementTree as StdET
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'extras'))
+
+import extract_panel_svg_og as extract  # noqa: E402
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+
+# Panels a and b (upper case labels are lowered), a panel z hidden inside b,
+# a group whose text is not a label, and a second panel a that wins
+COMPOSITE = b'''<?xml version="1.0" encoding="utf-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="300" height="100">
+  <g id="first_a" transform="translate(10, 10)">
+    <rect x="0" y="0" width="40" height="30"/>
+    <text x="5" y="15">a</text>
+  </g>
+  <g id="b" transform="translate(100, 10)">
+    <g id="z">
+      <rect x="0" y="0" width="20" height="20"/>
+      <text x="2" y="12">z</text>
+    </g>
+    <text x="5" y="15">B</text>
+  </g>
+  <g id="caption"><text x="0" y="90">not a label</text></g>
+  <g id="second_a" transform="translate(200, 20)">
+    <rect x="0" y="0" width="60" height="50"/>
+    <text x="5" y="15">a</text>
+  </g>
+</svg>
+'''
+
+ROOT_PANEL = b'''<svg xmlns="http://www.w3.org/2000/svg" width="50" height="50">
+  <rect x="0" y="0" width="50" height="50"/>
+  <text x="5" y="15">q</text>
+</svg>
+'''
+
+
+class ScanPanelsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.composite = self.write_svg('composite.svg', COMPOSITE)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_svg(self, name, data):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_labels(self):
+        labels, group = extract.scan_panels(self.composite)
+        self.assertEqual(labels, {'a', 'b'})
+        self.assertIsNone(group)
+
+    def test_panel_subtree_is_kept_whole(self):
+        labels, group = extract.scan_panels(self.composite, 'b')
+        self.assertEqual(labels, {'a', 'b'})
+        self.assertEqual(group.get('id'), 'b')
+        self.assertEqual(group.get('transform'), 'translate(100, 10)')
+        inner = group[0]
+        self.assertEqual(inner.get('id'), 'z')
+        self.assertEqual([child.tag.split('}')[-1] for child in inner], ['rect', 'text'])
+        self.assertEqual(inner[0].get('width'), '20')
+
+    def test_last_panel_with_a_label_wins(self):
+        _, group = extract.scan_panels(self.composite, 'a')
+        self.assertEqual(group.get('id'), 'second_a')
+
+    def test_nested_and_missing_labels_are_not_found(self):
+        self.assertIsNone(extract.scan_panels(self.composite, 'z')[1])
+        self.assertIsNone(extract.scan_panels(self.composite, 'c')[1])
+
+    def test_root_as_panel(self):
+        labels, group = extract.scan_panels(self.write_svg('root.svg', ROOT_PANEL), 'q')
+        self.assertEqual(labels, {'q'})
+        self.assertEqual(group.tag, '{%s}svg' % SVG_NS)
+        self.assertEqual(len(group), 2)
+
+    def test_extract_panel_writes_the_panel_at_the_origin(self):
+        output = os.path.join(self.tmpdir, 'panel.svg')
+        with mock.patch('sys.stdout', new_callable=io.StringIO):
+            self.assertTrue(extract.extract_panel(self.composite, 'a', output))
+        root = StdET.parse(output).getroot()
+        self.assertEqual((float(root.get('width')), float(root.get('height'))), (60.0, 50.0))
+        content = root[0]
+        self.assertEqual(content.get('transform'), 'translate(-200.0, -20.0)')
+        self.assertEqual([child.get('width') for child in content if child.tag.endswith('rect')], ['60'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Regression checks for path data handling in main.py."""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+def _long_path(count, trailing_x=False):
+    """Path data with count (x, y) pairs, mixing signs and decimals."""
+    parts = ['M 0 0']
+    for i in range(1, count):
+        parts.append(f'L {(i * 37) % 101 - 50.5} {(i * 53) % 89 - 20.25}')
+    if trailing_x:
+        parts.append('H 123.5')
+    return ' '.join(parts)
+
+
+class PathBoundsTest(unittest.TestCase):
+
+    def test_short_path(self):
+        self.assertEqual(main.get_path_bounds('M 10 20 L -5 40 L 30 -2 z'), (-5.0, -2.0, 30.0, 40.0))
+
+    def test_trailing_unpaired_x_extends_x_range(self):
+        self.assertEqual(main.get_path_bounds('M 0 0 L 10 10 H 25'), (0.0, 0.0, 25.0, 10.0))
+
+    def test_no_coordinates(self):
+        self.assertIsNone(main.get_path_bounds(''))
+        self.assertIsNone(main.get_path_bounds('M 5 z'))
+
+    def test_long_path_matches_pure_python_bounds(self):
+        for trailing_x in (False, True):
+            path_data = _long_path(main._NUMPY_MIN_COORDS, trailing_x)
+            with mock.patch.object(main, 'HAVE_NUMPY', False):
+                expected = main.get_path_bounds(path_data)
+                self.assertIsInstance(main._path_coords(path_data), tuple)
+            self.assertEqual(main.get_path_bounds(path_data), expected)
+
+    @unittest.skipUnless(main.HAVE_NUMPY, 'NumPy is not installed')
+    def test_long_path_uses_array_path(self):
+        path_data = _long_path(main._NUMPY_MIN_COORDS)
+        self.assertNotIsInstance(main._path_coords(path_data), tuple)
+        for value in main.get_path_bounds(path_data):
+            self.assertIs(type(value), float)
+
+
+class CompactPathDataTest(unittest.TestCase):
+
+    def assert_compacts(self, path_data, expected):
+        self.assertEqual(main.compact_path_data(path_data), expected)
+
+    def assert_unchanged(self, path_data):
+        self.assertIs(main.compact_path_data(path_data), path_data)
+
+    def test_absolute_horizontal_and_vertical_lines(self):
+        self.assert_compacts('M 0 0 L 10 0 L 10 5', 'M 0 0 H 10 V 5')
+
+    def test_relative_lines(self):
+        self.assert_compacts('m 0 0 l 10 0 l 0 5', 'm 0 0 h 10 v 5')
+
+    def test_compact_separators(self):
+        self.assert_compacts('M0,0L10,0L10,5', 'M 0 0 H 10 V 5')
+
+    def test_implicit_lineto_after_moveto(self):
+        self.assert_compacts('M 0 0 10 0', 'M 0 0 H 10')
+
+    def test_implicit_repeated_lineto(self):
+        self.assert_compacts('M 0 0 L 10 0 10 5', 'M 0 0 H 10 V 5')
+
+    def test_diagonal_line_is_kept(self):
+        self.assert_compacts('M 1 2 L 3 4 L 5 4', 'M 1 2 L 3 4 H 5')
+
+    def test_current_point_follows_curves(self):
+        self.assert_compacts('M 0 0 C 1 1 2 2 3 3 L 3 8', 'M 0 0 C 1 1 2 2 3 3 V 8')
+
+    def test_closepath_returns_to_subpath_start(self):
+        self.assert_compacts('M 0 0 L 10 10 Z L 0 5', 'M 0 0 L 10 10 Z V 5')
+
+    def test_nothing_to_compact(self):
+        self.assert_unchanged('M 0 0 L 10 10 L 20 5 z')
+
+    def test_arcs_are_left_alone(self):
+        self.assert_unchanged('M 0 0 A 5 5 0 0 1 10 0 L 10 5')
+
+    def test_malformed_data_is_left_alone(self):
+        self.assert_unchanged('M 0 0 L 10')
+        self.assert_unchanged('10 0 L 5 5')
+
+
+if __name__ == '__main__':
+    unittest.main()